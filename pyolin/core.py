@@ -1,5 +1,6 @@
 from dataclasses import dataclass
-from typing import Any, Callable, Iterator, Optional, Union
+from typing import Any, Callable, ContextManager, Iterator, Optional, Union
+import typing
 from pyolin.ioformat import (
     PARSERS,
     PRINTERS,
@@ -13,6 +14,10 @@ from pyolin.record import Header
 from pyolin.util import Item
 
 
+# A function opening the input stream of a pyolin program. See `plugins/__init__.py`.
+InputStream = Callable[[], ContextManager[typing.BinaryIO]]
+
+
 class PluginContext:
     def __init__(self):
         self._globals = {}
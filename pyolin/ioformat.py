@@ -66,6 +66,44 @@ class LimitReached(Exception):
         self.read_bytes = read_bytes
 
 
+_READ_CHUNK_SIZE = 8192
+_REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+_DelimiterFinder = typing.Callable[[bytearray, int], Optional[Tuple[int, int]]]
+
+
+def _literal_delimiter_finder(delimiter: bytes) -> _DelimiterFinder:
+    def find(buf: bytearray, searched: int) -> Optional[Tuple[int, int]]:
+        start = buf.find(delimiter, max(0, searched - len(delimiter) + 1))
+        if start < 0:
+            return None
+        return start, start + len(delimiter)
+
+    return find
+
+
+def _regex_delimiter_finder(pattern: "re.Pattern[bytes]") -> _DelimiterFinder:
+    def find(buf: bytearray, searched: int) -> Optional[Tuple[int, int]]:
+        # Check every prefix of the buffer, so that a variable-length pattern
+        # splits at the same place regardless of how the input is chunked.
+        for end in range(searched + 1, len(buf) + 1):
+            match = pattern.search(buf, 0, end)
+            if match:
+                return match.start(), end
+        return None
+
+    return find
+
+
+def _chunk_reader(stream: typing.BinaryIO) -> typing.Callable[[], bytes]:
+    # `read1` returns whatever is available without waiting for the rest of the
+    # chunk, so streaming input (e.g. from a pipe) is still processed as soon
+    # as it arrives.
+    read1 = getattr(stream, "read1", None)
+    if read1 is None:
+        return lambda: stream.read(1)
+    return lambda: read1(_READ_CHUNK_SIZE)
+
+
 def gen_split(
     stream: typing.BinaryIO, delimiter: str, *, limit: Optional[int] = None
 ) -> Generator[bytes, None, None]:
@@ -79,26 +117,36 @@ def gen_split(
     """
     buf = bytearray()
     binary_delimiter = delimiter.encode("utf-8")
+    if binary_delimiter and _REGEX_SPECIAL_CHARS.isdisjoint(delimiter):
+        find_delimiter = _literal_delimiter_finder(binary_delimiter)
+    else:
+        find_delimiter = _regex_delimiter_finder(re.compile(binary_delimiter))
+    read_chunk = _chunk_reader(stream)
     yielded = False
-    i = 0
+    # Number of bytes at the start of `buf` known to not complete a delimiter
+    searched = 0
     while True:
-        chunk = stream.read(1)
-        i += 1
-        if limit and i > limit and not yielded:
+        chunk = read_chunk()
+        buf.extend(chunk)
+        while True:
+            found = find_delimiter(buf, searched)
+            if not found:
+                searched = len(buf)
+                break
+            start, end = found
+            if limit and not yielded and end > limit:
+                break
+            yielded = True
+            yield buf[:start]
+            del buf[:end]
+            searched = 0
+        if limit and not yielded and len(buf) >= limit:
             # If no lines found when the limit is hit, raise exception
             raise LimitReached(bytes(chunk))
         if not chunk:
             if buf:
                 yield buf
             break
-        buf.extend(chunk)
-        while True:
-            match = re.search(binary_delimiter, buf)
-            if not match:
-                break
-            yielded = True
-            yield buf[: match.start()]
-            buf = bytearray()
 
 
 class AbstractParser(abc.ABC):
@@ -174,11 +222,14 @@ class TxtParser(AbstractParser):
     ) -> Generator[Record, None, None]:
         """Generates a record from the given iterable of lines."""
         assert self.field_separator
+        # Compile the separator once instead of looking it up in `re`'s cache
+        # for every record.
+        split_fields = re.compile(self.field_separator).split
         try:
             for record_bytes in gen_lines:
                 if record_bytes:
                     yield Record(
-                        *re.split(self.field_separator, record_bytes.decode("utf-8")),
+                        *split_fields(record_bytes.decode("utf-8")),
                         source=record_bytes,
                     )
                 else:
@@ -189,6 +240,9 @@ class TxtParser(AbstractParser):
             ) from None
 
 
+_UNESCAPED_DOUBLE_QUOTES = re.compile(r'[^\\]""')
+
+
 class CustomSniffer(csv.Sniffer):
     """A CSV sniffer that detects which CSV dialect and delimiters to use."""
 
@@ -216,7 +270,7 @@ class CustomSniffer(csv.Sniffer):
         if self.dialect_doublequote_decided:
             return False
         assert self.dialect
-        if re.search(r'[^\\]""', line):  # type: ignore
+        if _UNESCAPED_DOUBLE_QUOTES.search(line):
             self.dialect.doublequote = True
             return False
         if '\\"' in line:
@@ -411,6 +465,15 @@ class Printer(abc.ABC):
             header = header or SynthesizedHeader([str(i) for i in result.columns])
             result = (self.format_record(row) for _, row in result.iterrows())
             return (header, result)
+        elif (
+            "numpy" in sys.modules
+            and isinstance(result, sys.modules["numpy"].ndarray)
+            and result.dtype.names
+        ):
+            # Structured array, e.g. from `np.frombuffer(data, dtype=[...])`
+            header = header or SynthesizedHeader(list(result.dtype.names))
+            result = (self.format_record(row) for row in result.tolist())
+            return (header, result)
         elif isinstance(result, collections.abc.Iterable):
             if isinstance(result, (str, Record, tuple, bytes)):
                 result = (self.format_record(result),)
@@ -1,7 +1,7 @@
 """Implementation of the Python code parsing logic in Pyolin."""
 import ast
+import functools
 import io
-import textwrap
 import token
 import tokenize
 import traceback
@@ -82,6 +82,22 @@ def _replace_with_newline(tokens: List[tokenize.TokenInfo], pos: int) -> None:
         )
 
 
+def _invalid_syntax(
+    source: str, exc: SyntaxError, *, prefix_len: int = 0
+) -> RuntimeError:
+    """Creates the error to show for a syntax error in `source`, with a caret
+    under the line and column of the error. `prefix_len` is the number of
+    characters that were prepended to the first line of `source` when it was
+    parsed."""
+    assert exc.offset
+    lines = source.rstrip("\n").split("\n")
+    lineno = min(exc.lineno or 1, len(lines))
+    offset = exc.offset - prefix_len if lineno == 1 else exc.offset
+    message_lines = [f"  {line}" for line in lines]
+    message_lines.insert(lineno, f"  {' ' * max(offset - 1, 0)}^")
+    return RuntimeError("Invalid syntax:\n" + "\n".join(message_lines))
+
+
 def _parse(prog: str) -> Tuple[ast.Module, ast.Expression]:
     """
     Parse the given pyolin program into the exec statements and eval statements that can be
@@ -99,15 +115,7 @@ def _parse(prog: str) -> Tuple[ast.Module, ast.Expression]:
     try:
         exec_statements = ast.parse(prog_stmts, mode="exec")
     except SyntaxError as exc:
-        assert exc.offset
-        raise RuntimeError(
-            textwrap.dedent(
-                f"""\
-                Invalid syntax:
-                  {prog_stmts}
-                  {" "*(exc.offset-1)}^"""
-            )
-        ) from None
+        raise _invalid_syntax(prog_stmts, exc) from None
     try:
         # Try to parse as generator expression (the common case)
         eval_expr = ast.parse(f"({prog_expr})", mode="eval")
@@ -120,22 +128,11 @@ def _parse(prog: str) -> Tuple[ast.Module, ast.Expression]:
                 # Check if it's executable to provide better error message
                 ast.parse(f"{prog_expr}", mode="exec")
             except SyntaxError:
-                assert exc.offset
-                raise RuntimeError(
-                    textwrap.dedent(
-                        f"""\
-                    Invalid syntax:
-                      {prog_expr}
-                      {" "*(exc.offset-2)}^"""
-                    )
-                ) from None
+                # Account for the parenthesis added in front of the expression
+                raise _invalid_syntax(prog_expr, exc, prefix_len=1) from None
             else:
                 raise RuntimeError(
-                    textwrap.dedent(
-                        f"""\
-                        Cannot evaluate value from statement:
-                          {prog_expr}"""
-                    )
+                    f"Cannot evaluate value from statement:\n  {prog_expr}"
                 ) from None
     debug(ast.dump(eval_expr))
     return exec_statements, eval_expr
@@ -159,6 +156,20 @@ class UserError(RuntimeError):
         return "".join(self.formatted_tb()).rstrip("\n")
 
 
+@functools.lru_cache(maxsize=256)
+def _compile(prog: str) -> CodeType:
+    """Compiles the given pyolin program into a module defining the
+    `__pyolin_prog` function. Code objects are immutable, so the result is
+    cached for programs that are run more than once."""
+    exec_code, eval_code = _parse(prog)
+    debug("Resulting AST", ast.dump(exec_code), ast.dump(eval_code))
+    func_def = ast.parse("def __pyolin_prog(): pass")
+    function_body = typing.cast(ast.FunctionDef, func_def.body[0]).body
+    function_body.extend(exec_code.body)
+    function_body.append(ast.Return(eval_code.body, lineno=1, col_offset=0))
+    return compile(func_def, filename="pyolin_user_prog.py", mode="exec")
+
+
 class Prog:
     """The intermediate representation of the user-provided Pyolin program."""
 
@@ -170,13 +181,7 @@ class Prog:
             self.func = prog
             self.func_code = None
         else:
-            exec_code, eval_code = _parse(prog)
-            debug("Resulting AST", ast.dump(exec_code), ast.dump(eval_code))
-            func_def = ast.parse("def __pyolin_prog(): pass")
-            function_body = typing.cast(ast.FunctionDef, func_def.body[0]).body
-            function_body.extend(exec_code.body)
-            function_body.append(ast.Return(eval_code.body, lineno=1, col_offset=0))
-            self.func_code = compile(func_def, filename="pyolin_user_prog.py", mode="exec")
+            self.func_code = _compile(prog)
 
     def exec(self, global_dict: Dict[str, Any]) -> Any:
         """Executes the user-provided Pyolin program and returns the result."""
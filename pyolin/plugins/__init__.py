@@ -3,9 +3,11 @@ Each plugin should have a function with the following signature:
 
     def register(
         ctx: PluginContext,
-        input_stream: Callable[[], ContextManager[typing.BinaryIO]],
+        input_stream: InputStream,
         config: PyolinConfig,
     )
+
+where `InputStream` and the other types are defined in `pyolin.core`.
 """
 from . import auto_parser, json, lines, argv, pip
 
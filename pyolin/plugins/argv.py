@@ -1,14 +1,12 @@
 import sys
-from typing import Callable, ContextManager
-import typing
-from pyolin.core import PluginContext, PyolinConfig
+from pyolin.core import InputStream, PluginContext, PyolinConfig
 from pyolin.field import DeferredType
 from pyolin.util import Item
 
 
 def register(
     ctx: PluginContext,
-    input_stream: Callable[[], ContextManager[typing.BinaryIO]],
+    input_stream: InputStream,
     config: PyolinConfig,
 ):
     def _argv_var():
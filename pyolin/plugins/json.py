@@ -4,10 +4,9 @@ from io import TextIOWrapper
 import json
 from typing import (
     Any,
-    Callable,
-    ContextManager,
     Generator,
     Iterable,
+    List,
     Optional,
     Sequence,
     Union,
@@ -22,7 +21,7 @@ from pyolin.ioformat import (
     UnexpectedDataFormat,
     gen_split,
 )
-from pyolin.core import PluginContext, PyolinConfig
+from pyolin.core import InputStream, PluginContext, PyolinConfig
 from pyolin.record import Record
 from pyolin.util import (
     _UNDEFINED_,
@@ -208,7 +207,8 @@ class JsonFinder:
     """
 
     def __init__(self):
-        self._accumulated = ""
+        # Pieces of the input that are part of a value that is not complete yet.
+        self._accumulated: List[str] = []
         self._token_stack = []
 
     def _peek_stack(self) -> Optional[str]:
@@ -217,8 +217,11 @@ class JsonFinder:
     def add_input(self, s: str) -> Sequence[JsonValue]:
         parsed_values = []
         skip_next = False
+        # Start of the part of `s` that does not belong to a parsed value yet.
+        # Slicing `s` at value boundaries avoids growing a string one character
+        # at a time, which is quadratic for large values.
+        start = 0
         for i, c in enumerate(s):
-            self._accumulated += c
             if skip_next:
                 skip_next = False
                 continue
@@ -236,18 +239,23 @@ class JsonFinder:
             elif c == "\\":
                 skip_next = True
             if not self._token_stack:
-                if self._accumulated.strip("\n\r\t "):
-                    parsed_values.append(json.loads(self._accumulated))
-                self._accumulated = ""
+                self._accumulated.append(s[start : i + 1])
+                value = "".join(self._accumulated)
+                if value.strip("\n\r\t "):
+                    parsed_values.append(json.loads(value))
+                self._accumulated.clear()
+                start = i + 1
+        if start < len(s):
+            self._accumulated.append(s[start:])
         return parsed_values
 
     def is_exhausted(self) -> bool:
-        return self._accumulated == ""
+        return not self._accumulated
 
 
 def register(
     ctx: PluginContext,
-    input_stream: Callable[[], ContextManager[typing.BinaryIO]],
+    input_stream: InputStream,
     config: PyolinConfig,
 ):
     ctx.export_printers(json=JsonPrinter, jsonl=JsonlPrinter)
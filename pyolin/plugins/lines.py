@@ -3,19 +3,17 @@ Plugin that provides the `lines` and `line` variables, which splits the input by
 character.
 """
 
-from typing import Callable, ContextManager
-import typing
-from pyolin.core import PluginContext, PyolinConfig
+from pyolin.core import InputStream, PluginContext, PyolinConfig
 from pyolin.ioformat import gen_split
 from pyolin.util import Item, CachedItem, NoMoreRecords, ReplayIter, StreamingSequence
 
 
 def register(
     ctx: PluginContext,
-    input_stream: Callable[[], ContextManager[typing.BinaryIO]],
+    input_stream: InputStream,
     config: PyolinConfig,
 ):
-    def gen_lines(input_stream: Callable[[], ContextManager[typing.BinaryIO]]):
+    def gen_lines(input_stream: InputStream):
         with input_stream() as io_stream:
             for bytearr in gen_split(io_stream, "\n"):
                 yield bytearr.decode("utf-8")
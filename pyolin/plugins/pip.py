@@ -7,9 +7,8 @@ e.g.
 """
 
 import sys
-from typing import Any, Callable, ContextManager, Generator
-import typing
-from pyolin.core import PluginContext, PyolinConfig
+from typing import Any, Generator
+from pyolin.core import InputStream, PluginContext, PyolinConfig
 import subprocess
 from pyolin.ioformat import Printer, PrinterConfig
 
@@ -40,7 +39,7 @@ class PipCustomPrinter(Printer):
 
 def register(
     ctx: PluginContext,
-    input_stream: Callable[[], ContextManager[typing.BinaryIO]],
+    input_stream: InputStream,
     config: PyolinConfig,
 ):
     def _pip_var():
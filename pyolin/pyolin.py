@@ -1,6 +1,7 @@
 """Main entry point for Pyolin, the utility to easily write Python one-liners."""
 
 import argparse
+import functools
 import importlib
 import itertools
 import sys
@@ -8,8 +9,6 @@ import sys
 from contextlib import contextmanager
 from typing import (
     Any,
-    Callable,
-    ContextManager,
     Generator,
     Iterable,
     Optional,
@@ -19,7 +18,7 @@ from typing import (
 import typing
 from hashbang import command, Argument
 
-from pyolin.core import PluginContext, PyolinConfig
+from pyolin.core import InputStream, PluginContext, PyolinConfig
 
 from .field import DeferredType
 from .ioformat import (
@@ -43,6 +42,22 @@ from .parser import Prog
 PLUGIN_CONTEXT = PluginContext()
 
 
+@contextmanager
+def _open_input(
+    input_: Union[str, typing.BinaryIO, None]
+) -> Generator[typing.BinaryIO, None, None]:
+    """Get the IO from the given input filename, or from stdin if `input_` is
+    None."""
+    if isinstance(input_, str):
+        mode = "rb"
+        with open(input_, mode) as input_file:
+            yield input_file
+    elif input_ is not None:
+        yield input_
+    else:
+        yield sys.stdin.buffer
+
+
 def _execute_internal(
     prog,
     *args,
@@ -52,20 +67,10 @@ def _execute_internal(
     input_format="auto",
     output_format="auto",
 ) -> Tuple[Any, PyolinConfig]:
-    prog = Prog(prog)
-
-    @contextmanager
-    def input_stream() -> Generator[typing.BinaryIO, None, None]:
-        """Get the IO from the given input filename, or from stdin if `input_file`
-        is None."""
-        if isinstance(input_, str):
-            mode = "rb"
-            with open(input_, mode) as input_file:
-                yield input_file
-        elif input_ is not None:
-            yield input_
-        else:
-            yield sys.stdin.buffer
+    if not isinstance(prog, Prog):
+        prog = Prog(prog)
+
+    input_stream: InputStream = functools.partial(_open_input, input_)
 
     config = PyolinConfig(
         output_format,
@@ -74,14 +79,14 @@ def _execute_internal(
         input_format,
     )
 
-    def gen_records(input_stream: Callable[[], ContextManager[typing.BinaryIO]]):
+    def gen_records(input_stream: InputStream):
         with input_stream() as io_stream:
             parser = config._freeze_parser()  # pylint:disable=protected-access
             for i, record in enumerate(parser.records(io_stream)):
                 record.set_num(i)
                 yield record
 
-    def get_contents(input_stream: Callable[[], ContextManager[typing.BinaryIO]]) -> DeferredType:
+    def get_contents(input_stream: InputStream) -> DeferredType:
         with input_stream() as io_stream:
             config._freeze_parser()  # pylint:disable=protected-access
             return DeferredType(io_stream.read())
@@ -160,6 +165,9 @@ def run(*args, **kwargs):
     results in Python list or objects, while still keeping the input parsing and output formatting
     capabilities of pyolin. Serious scripts should migrate away from those as well, perhaps
     outputting json and then using pyolin as a data-formatting pass-through.
+
+    The program can be given as source code, a function, or a `Prog` that was
+    compiled ahead of time to be run more than once.
     """
     result, _ = _execute_internal(*args, **kwargs)
     if isinstance(result, (str, bytes)):
@@ -1,11 +1,12 @@
 """Representations of a Record (a.k.a. a row) coming from a parser."""
 import abc
+import functools
 import itertools
 from itertools import zip_longest
 from typing import Iterable, Optional, TypeVar, Union
 
 from .field import DeferredType
-from .util import StreamingSequence, cache
+from .util import StreamingSequence
 
 
 class HasHeader:
@@ -85,8 +86,7 @@ class RecordSequence(StreamingSequence[T], HasHeader):
         seq1, self._seq_for_header = itertools.tee(records_iter)
         super().__init__(r for r in seq1 if not isinstance(r, Header))
 
-    @property
-    @cache
+    @functools.cached_property
     def header(self) -> Optional[Header]:
         firstrow = next(self._seq_for_header, None)
         if isinstance(firstrow, Header):
@@ -3,37 +3,89 @@
 import contextlib
 import difflib
 from dataclasses import dataclass
+import functools
 import io
 import os
-import signal
+import runpy
+import selectors
 import subprocess
 import sys
 import textwrap
-from typing import ClassVar, Dict, Optional, Union
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import pytest
 
 from pyolin import pyolin
 
 
+_TEST_DIR = os.path.dirname(__file__)
+_PYOLIN_COMMAND = (sys.executable, "-m", "pyolin")
+
+
+@functools.lru_cache(maxsize=None)
+def _test_file_path(filename: str) -> str:
+    return os.path.join(_TEST_DIR, filename)
+
+
 @dataclass
 class File:
     """Represent a test input file, relative to the directory containing this
-    source file."""
+    source file.
+
+    When used as the input of the `pyolin` fixture, the file contents are served
+    from memory unless `from_memory` is False, in which case pyolin opens the
+    file itself (e.g. to test `filename`)."""
 
     filename: str
+    from_memory: bool = True
 
     def path(self) -> str:
-        return os.path.join(os.path.dirname(__file__), self.filename)
+        return _test_file_path(self.filename)
+
+
+class DataFiles(Dict[str, bytes]):
+    """Contents of the test data files by file name, each read from disk on
+    first use."""
+
+    def __missing__(self, filename: str) -> bytes:
+        with open(_test_file_path(filename), "rb") as data_file:
+            contents = self[filename] = data_file.read()
+        return contents
+
+
+@pytest.fixture(scope="session")
+def data_files() -> DataFiles:
+    """Test data files, read at most once per test session."""
+    return DataFiles()
+
+
+@pytest.fixture(scope="session")
+def nba_bytes(data_files) -> bytes:
+    """Contents of data_nba.txt, read once per test session."""
+    return data_files["data_nba.txt"]
 
 
-def _process_input(input_: Union[File, str, bytes]) -> Union[str, io.BytesIO]:
+@functools.lru_cache(maxsize=None)
+def _encode_str_input(input_: str) -> bytes:
+    """Dedents and encodes a string test input. String inputs are literals in
+    the test source, so `textwrap.dedent` only runs once per input in a
+    session."""
+    return textwrap.dedent(input_.lstrip("\n")).encode("utf-8")
+
+
+def _process_input(
+    input_: Union[File, str, bytes], data_files: DataFiles
+) -> Union[str, io.BytesIO]:
     if isinstance(input_, bytes):
         return io.BytesIO(input_)
     elif isinstance(input_, File):
+        if input_.from_memory:
+            return io.BytesIO(data_files[input_.filename])
         return input_.path()
     elif isinstance(input_, str):
-        return io.BytesIO(textwrap.dedent(input_.lstrip("\n")).encode("utf-8"))
+        return io.BytesIO(_encode_str_input(input_))
     else:
         return input_
 
@@ -54,8 +106,6 @@ class TextIO(io.TextIOWrapper):
         return self._io.getvalue()
 
     def __eq__(self, o):
-        if isinstance(o, str):
-            return self.getvalue().__eq__(o)
         if isinstance(o, bytes):
             return self.getbytes().__eq__(o)
         return self.getvalue().__eq__(o)
@@ -65,42 +115,163 @@ class TextIO(io.TextIOWrapper):
 
 
 @pytest.fixture(name="pyolin")
-def pyolin_prog():
+def pyolin_prog(monkeypatch, data_files, nba_bytes):
     """A pytest fixture to allow getting the "pyolin" function parameter for
-    testing."""
+    testing.
+
+    The program runs in-process. Pyolin shifts `sys.argv` for the user program,
+    so it is restored when the test finishes.
+
+    If `input_` is not given, the contents of data_nba.txt are used, served from
+    memory rather than reopening the file for every test."""
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
 
     def run_cli(
         prog,
         *,
-        input_: Union[str, bytes, File] = File("data_nba.txt"),
+        input_: Union[str, bytes, File] = nba_bytes,
         extra_args=(),
         **kwargs,
     ):
-        with run_capturing_output(errmsg=f"Prog: {prog}") as output:
+        with run_capturing_output(prog=prog) as output:
             # pylint:disable=protected-access
             pyolin._command_line(
-                prog, *extra_args, input_=_process_input(input_), **kwargs
+                prog,
+                *extra_args,
+                input_=_process_input(input_, data_files),
+                **kwargs,
             )
             # pylint:enable=protected-access
             return output
 
     @contextlib.contextmanager
     def pyolin_popen(prog, *, extra_args=(), text=True, **kwargs):
+        # Each call starts a new interpreter on purpose. The tests left on
+        # `popen` check things a shared worker process could not give them:
+        # a closed stdout pipe, or a fresh `sys.modules` at startup.
+        for stream in ("stdin", "stdout", "stderr"):
+            kwargs.setdefault(stream, subprocess.PIPE)
+        # Unbuffered pipes, so that writes reach pyolin without a flush
+        kwargs.setdefault("bufsize", 0)
         with subprocess.Popen(
-            [sys.executable, "-m", "pyolin", prog] + list(extra_args),
-            stdin=kwargs.get("stdin", subprocess.PIPE),
-            stdout=kwargs.get("stdout", subprocess.PIPE),
-            stderr=kwargs.get("stderr", subprocess.PIPE),
-            universal_newlines=text,
-            **kwargs,
+            [*_PYOLIN_COMMAND, prog, *extra_args], text=text, **kwargs
         ) as proc:
             yield proc
 
+    @contextlib.contextmanager
+    def pyolin_in_process(prog, *, extra_args=(), text=True):
+        with _InProcessPyolin(prog, extra_args=extra_args, text=text) as proc:
+            yield proc
+
     run_cli.popen = pyolin_popen
+    run_cli.in_process = pyolin_in_process
 
     return run_cli
 
 
+class _InProcessPyolin:
+    """Runs the pyolin command line on a thread in the test process, connected
+    to the test through pipes. This has the same `stdin`, `stdout`, `stderr`,
+    `returncode`, `wait()` and `communicate()` interface as `subprocess.Popen`,
+    without paying for the interpreter startup of a new process.
+
+    The program is started through `pyolin/__main__.py` with `runpy`, the same
+    entry point `python -m pyolin` uses, reusing the modules already imported by
+    the test process.
+
+    Pyolin writes to `sys.stdout` and reads from `sys.stdin`, so only one
+    instance can run at a time. Tests that need a separate process, like
+    closing stdout to trigger a broken pipe, should use `pyolin.popen`."""
+
+    def __init__(self, prog, *, extra_args=(), text=True):
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        mode = "" if text else "b"
+        self.stdin = open(stdin_w, "w" + mode)  # pylint:disable=consider-using-with
+        self.stdout = open(stdout_r, "r" + mode)  # pylint:disable=consider-using-with
+        self.stderr = open(stderr_r, "r" + mode)  # pylint:disable=consider-using-with
+        self._child_stdin = io.TextIOWrapper(open(stdin_r, "rb"))
+        self._child_stdout = io.TextIOWrapper(open(stdout_w, "wb"), write_through=True)
+        self._child_stderr = io.TextIOWrapper(open(stderr_w, "wb"), write_through=True)
+        self.returncode = None
+        self._thread = threading.Thread(
+            target=self._run, args=([prog, *extra_args],), daemon=True
+        )
+
+    def _run(self, args):
+        stdin = sys.stdin
+        sys.stdin = self._child_stdin
+        try:
+            with contextlib.redirect_stdout(self._child_stdout):
+                with contextlib.redirect_stderr(self._child_stderr):
+                    # Go through `python -m pyolin`'s entry point, which reads
+                    # its arguments from `sys.argv`. The `pyolin` fixture
+                    # restores `sys.argv` after the test.
+                    sys.argv = ["pyolin", *args]
+                    runpy.run_module("pyolin", run_name="__main__")
+        except SystemExit as exc:
+            self.returncode = 0 if exc.code is None else exc.code
+        else:
+            self.returncode = 0
+        finally:
+            sys.stdin = stdin
+            for stream in (self._child_stdout, self._child_stderr):
+                with contextlib.suppress(OSError, ValueError):
+                    stream.close()
+
+    def wait(self, timeout=None):
+        """Waits for the program to finish and returns its exit code. Fails
+        the test if the program is still running after `timeout` seconds."""
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            # The thread still owns the redirected `sys.stdin` and
+            # `sys.stdout`, which would leak into later tests
+            pytest.fail(f"pyolin did not finish within {timeout} seconds")
+        return self.returncode
+
+    def communicate(self, input_=None):
+        """Writes `input_` to stdin, closes it, and waits for the program to
+        finish. Returns the (stdout, stderr) pair.
+
+        Like `subprocess.Popen.communicate`, the input is written and stderr is
+        read on helper threads while stdout is read, so that neither side
+        blocks on a full pipe buffer."""
+
+        def write_input():
+            # The program may finish without reading all of its input
+            with contextlib.suppress(OSError):
+                if input_:
+                    self.stdin.write(input_)
+                self.stdin.close()
+
+        stderr = []
+        helpers = [
+            threading.Thread(target=write_input, daemon=True),
+            threading.Thread(
+                target=lambda: stderr.append(self.stderr.read()), daemon=True
+            ),
+        ]
+        for helper in helpers:
+            helper.start()
+        stdout = self.stdout.read()
+        for helper in helpers:
+            helper.join()
+        self.wait()
+        return stdout, stderr[0]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc_info):
+        with contextlib.suppress(OSError):
+            self.stdin.close()
+        self.wait(timeout=5)
+        for stream in (self.stdout, self.stderr, self._child_stdin):
+            stream.close()
+
+
 class ErrorWithStderr(Exception):
     """Error with stderr captured. See `run_capturing_output`."""
 
@@ -122,32 +293,58 @@ class ErrorWithStderr(Exception):
         return "\n".join(result)
 
 
-class timeout:  # pylint:disable=invalid-name
-    """Waits for the given number of seconds or raise TimeoutError.
-
-    Usage:
-
-    with timeout(10):
-        # do potentially long-running stuff
-    """
-
-    def __init__(self, seconds, error_message="Timeout"):
-        self.seconds = seconds
-        self.error_message = error_message
-
-    def _handle_timeout(self, signum, frame):
-        raise TimeoutError(self.error_message)
-
-    def __enter__(self):
-        signal.signal(signal.SIGALRM, self._handle_timeout)
-        signal.alarm(self.seconds)
-
-    def __exit__(self, _type, _value, _traceback):
-        signal.alarm(0)
+def readline_with_timeout(stream, seconds: float = 2):
+    """Reads a line from the pipe behind `stream`, raising TimeoutError if the
+    line is not complete within `seconds`.
+
+    This reads from the file descriptor directly, one byte at a time so that
+    nothing past the line is consumed, and should not be mixed with reads
+    through the buffered `stream`."""
+    deadline = time.monotonic() + seconds
+    fd = stream.fileno()
+    line = bytearray()
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while not line.endswith(b"\n"):
+            if not selector.select(deadline - time.monotonic()):
+                raise TimeoutError(f"Timed out reading line. Got {bytes(line)!r}")
+            byte = os.read(fd, 1)
+            if not byte:
+                break
+            line += byte
+    if isinstance(stream, io.TextIOBase):
+        return line.decode("utf-8").replace("\r\n", "\n")
+    return bytes(line)
+
+
+def read_with_timeout(stream, size: int, seconds: float = 2) -> bytes:
+    """Reads exactly `size` bytes from the pipe behind `stream`, raising
+    TimeoutError if they don't arrive within `seconds`.
+
+    Like `readline_with_timeout`, this reads the file descriptor directly, but
+    in as few reads as the writer allows."""
+    deadline = time.monotonic() + seconds
+    fd = stream.fileno()
+    data = bytearray()
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while len(data) < size:
+            if not selector.select(deadline - time.monotonic()):
+                raise TimeoutError(f"Timed out reading. Got {bytes(data)!r}")
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+    return bytes(data)
 
 
 @contextlib.contextmanager
-def run_capturing_output(*, errmsg: Optional[str] = None):
+def run_capturing_output(*, prog: Optional[str] = None):
+    """Captures stdout and stderr, wrapping any error in `ErrorWithStderr`.
+
+    The failure message is only formatted when an error is raised, so that
+    passing runs do not pay for building it.
+    """
     out = TextIO()
     err = TextIO()
     with contextlib.redirect_stdout(out):
@@ -155,6 +352,7 @@ def run_capturing_output(*, errmsg: Optional[str] = None):
             try:
                 yield out
             except BaseException as exc:
+                errmsg = None if prog is None else f"Prog: {prog}"
                 raise ErrorWithStderr(err.getvalue(), errmsg=errmsg) from exc
 
 
@@ -165,6 +363,8 @@ def removeprefix(text: str, prefix: str) -> str:
 def removesuffix(text: str, suffix: str) -> str:
     return text[:-len(suffix)] if text.endswith(suffix) else text
 
+
+@functools.lru_cache(maxsize=None)
 def string_block(text: str) -> str:
     """
     Similar to textwrap.dedent, but with different logic such that the whitespace
@@ -214,8 +414,50 @@ def assert_contains(output, substring):
     )
 
 
+def _parse_md_table(text: str) -> Optional[Tuple[Tuple[str, ...], ...]]:
+    """Parses a markdown table into a tuple of rows of stripped cells, or returns
+    None if `text` is not a markdown table."""
+    lines = text.splitlines()
+    if not lines or not all(line.startswith("|") for line in lines):
+        return None
+    return tuple(
+        tuple(cell.strip() for cell in line.strip("|").split("|")) for line in lines
+    )
+
+
+_DIFF_WINDOW_LINES = 200
+
+
+def _diff_lines(left: Sequence[str], right: Sequence[str]) -> List[str]:
+    """Unified diff of the given lines, limited to a window starting just
+    before the first difference. `difflib` is quadratic in the worst case,
+    which is slow for large outputs that differ all over."""
+    first_diff = next(
+        (i for i, (a, b) in enumerate(zip(left, right)) if a != b),
+        min(len(left), len(right)),
+    )
+    start = max(first_diff - 3, 0)
+    end = first_diff + _DIFF_WINDOW_LINES
+    diff = list(difflib.unified_diff(left[start:end], right[start:end], lineterm=""))
+    if len(left) > end or len(right) > end:
+        diff.append(f"... (diff limited to lines {start + 1}-{end})")
+    return diff
+
+
 def pytest_assertrepr_compare(op, left, right):
-    if isinstance(left, TextIO) or isinstance(right, TextIO) and op == "==":
+    if op == "==" and (isinstance(left, TextIO) or isinstance(right, TextIO)):
         left = str(left)
         right = str(right)
-        return list(difflib.unified_diff(left.split("\n"), right.split("\n")))
+        result = []
+        left_table = _parse_md_table(left)
+        right_table = _parse_md_table(right)
+        if left_table is not None and right_table is not None:
+            # Point at the cells that differ, which is easier to read than a
+            # diff of the padded lines. Tables that only differ in padding
+            # fall through to the text diff below.
+            for i, (left_row, right_row) in enumerate(zip(left_table, right_table)):
+                if left_row != right_row:
+                    result.append(f"Row {i}: {left_row} != {right_row}")
+            if len(left_table) != len(right_table):
+                result.append(f"Rows: {len(left_table)} != {len(right_table)}")
+        return result + _diff_lines(left.split("\n"), right.split("\n"))
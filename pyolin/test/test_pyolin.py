@@ -4,16 +4,80 @@
 # pylint: disable=too-many-lines
 # pylint: disable=redefined-outer-name
 
+import importlib.util
+import io
 import os
 from pprint import pformat
 from unittest import mock
 
 import pytest
 from pyolin import pyolin
-from pyolin.parser import UserError
-from pyolin.util import _UNDEFINED_
+from pyolin.parser import Prog, UserError
+from pyolin.util import (
+    CachedItem,
+    Item,
+    ItemDict,
+    StreamingSequence,
+    Undefined,
+    _UNDEFINED_,
+)
+
+from .conftest import (
+    ErrorWithStderr,
+    File,
+    read_with_timeout,
+    readline_with_timeout,
+    string_block,
+)
 
-from .conftest import ErrorWithStderr, string_block, timeout, File
+# Expected outputs shared by several tests. These are written at column 0 so
+# they can be used as-is, without going through `string_block`.
+_EXPECTED_NBA_TABLE = """\
+| 0       | 1            | 2  | 3  | 4     |
+| ------- | ------------ | -- | -- | ----- |
+| Bucks   | Milwaukee    | 60 | 22 | 0.732 |
+| Raptors | Toronto      | 58 | 24 | 0.707 |
+| 76ers   | Philadelphia | 51 | 31 | 0.622 |
+| Celtics | Boston       | 49 | 33 | 0.598 |
+| Pacers  | Indiana      | 48 | 34 | 0.585 |
+"""
+
+_EXPECTED_COLORS_MD = """\
+| color   | value |
+| ------- | ----- |
+| red     | #f00  |
+| green   | #0f0  |
+| blue    | #00f  |
+| cyan    | #0ff  |
+| magenta | #f0f  |
+| yellow  | #ff0  |
+| black   | #000  |
+"""
+
+_EXPECTED_NESTED_JSON = """\
+[
+  [
+    "foo",
+    [
+      "a",
+      "b"
+    ]
+  ],
+  [
+    "bar",
+    [
+      "c",
+      "d"
+    ]
+  ]
+]
+"""
+
+# pandas is only a dev dependency. Check for it without importing it, so that
+# collecting the tests doesn't pay for the import.
+requires_pandas = pytest.mark.skipif(
+    importlib.util.find_spec("pandas") is None, reason="pandas is not installed"
+)
 
 
 def test_lines(pyolin):
@@ -54,18 +118,7 @@ def test_line(pyolin):
 
 
 def test_fields(pyolin):
-    assert pyolin("fields") == string_block(
-        """
-        | 0       | 1            | 2  | 3  | 4     |
-        | ------- | ------------ | -- | -- | ----- |
-        | Bucks   | Milwaukee    | 60 | 22 | 0.732 |
-        | Raptors | Toronto      | 58 | 24 | 0.707 |
-        | 76ers   | Philadelphia | 51 | 31 | 0.622 |
-        | Celtics | Boston       | 49 | 33 | 0.598 |
-        | Pacers  | Indiana      | 48 | 34 | 0.585 |
-
-        """
-    )
+    assert pyolin("fields") == _EXPECTED_NBA_TABLE
 
 
 def test_awk_output_format(pyolin):
@@ -271,34 +324,200 @@ def test_regex(pyolin):
     )
 
 
-def test_addition(pyolin):
-    assert pyolin("fields[2] + 100") == string_block(
-        """
-        | value |
-        | ----- |
-        | 160   |
-        | 158   |
-        | 151   |
-        | 149   |
-        | 148   |
+@pytest.mark.parametrize(
+    "prog, expected",
+    [
+        pytest.param(
+            "fields[2] + 100",
+            string_block(
+                """
+                | value |
+                | ----- |
+                | 160   |
+                | 158   |
+                | 151   |
+                | 149   |
+                | 148   |
 
-        """
-    )
+                """
+            ),
+            id="addition",
+        ),
+        pytest.param(
+            "100 + fields[2]",
+            string_block(
+                """
+                | value |
+                | ----- |
+                | 160   |
+                | 158   |
+                | 151   |
+                | 149   |
+                | 148   |
 
+                """
+            ),
+            id="radd",
+        ),
+        pytest.param(
+            "fields[2] + fields[0]",
+            string_block(
+                """
+                | value     |
+                | --------- |
+                | 60Bucks   |
+                | 58Raptors |
+                | 5176ers   |
+                | 49Celtics |
+                | 48Pacers  |
 
-def test_radd(pyolin):
-    assert pyolin("100 + fields[2]") == string_block(
-        """
-        | value |
-        | ----- |
-        | 160   |
-        | 158   |
-        | 151   |
-        | 149   |
-        | 148   |
+                """
+            ),
+            id="field-concat",
+        ),
+        pytest.param(
+            "fields[0] + fields[2]",
+            string_block(
+                """
+                | value     |
+                | --------- |
+                | Bucks60   |
+                | Raptors58 |
+                | 76ers51   |
+                | Celtics49 |
+                | Pacers48  |
 
-        """
-    )
+                """
+            ),
+            id="field-concat-reversed",
+        ),
+        pytest.param(
+            "fields[0] if fields[2] < 51",
+            string_block(
+                """
+                | value   |
+                | ------- |
+                | Celtics |
+                | Pacers  |
+
+                """
+            ),
+            id="lt",
+        ),
+        pytest.param(
+            "fields[0] if fields[2] <= 51",
+            string_block(
+                """
+                | value   |
+                | ------- |
+                | 76ers   |
+                | Celtics |
+                | Pacers  |
+
+                """
+            ),
+            id="le",
+        ),
+        pytest.param(
+            "fields[2] - 50",
+            string_block(
+                """
+                | value |
+                | ----- |
+                | 10    |
+                | 8     |
+                | 1     |
+                | -1    |
+                | -2    |
+
+                """
+            ),
+            id="subtraction",
+        ),
+        pytest.param(
+            "50 - fields[2]",
+            string_block(
+                """
+                | value |
+                | ----- |
+                | -10   |
+                | -8    |
+                | -1    |
+                | 1     |
+                | 2     |
+
+                """
+            ),
+            id="rsub",
+        ),
+        pytest.param(
+            "fields[2] << 2",
+            string_block(
+                """
+                | value |
+                | ----- |
+                | 240   |
+                | 232   |
+                | 204   |
+                | 196   |
+                | 192   |
+
+                """
+            ),
+            id="left-shift",
+        ),
+        pytest.param(
+            "(-fields[2])",
+            string_block(
+                """
+                | value |
+                | ----- |
+                | -60   |
+                | -58   |
+                | -51   |
+                | -49   |
+                | -48   |
+
+                """
+            ),
+            id="neg",
+        ),
+        pytest.param(
+            "fields[3] * 10",
+            string_block(
+                """
+                | value |
+                | ----- |
+                | 220   |
+                | 240   |
+                | 310   |
+                | 330   |
+                | 340   |
+
+                """
+            ),
+            id="multiplication",
+        ),
+        pytest.param(
+            "fields[0] * 2",
+            string_block(
+                """
+                | value          |
+                | -------------- |
+                | BucksBucks     |
+                | RaptorsRaptors |
+                | 76ers76ers     |
+                | CelticsCeltics |
+                | PacersPacers   |
+
+                """
+            ),
+            id="string-multiplication",
+        ),
+    ],
+)
+def test_field_expression(pyolin, prog, expected):
+    assert pyolin(prog) == expected
 
 
 def test_field_addition(pyolin):
@@ -316,36 +535,6 @@ def test_field_addition(pyolin):
     )
 
 
-def test_field_concat(pyolin):
-    assert pyolin("fields[2] + fields[0]") == string_block(
-        """
-        | value     |
-        | --------- |
-        | 60Bucks   |
-        | 58Raptors |
-        | 5176ers   |
-        | 49Celtics |
-        | 48Pacers  |
-
-        """
-    )
-
-
-def test_field_concat_reversed(pyolin):
-    assert pyolin("fields[0] + fields[2]") == string_block(
-        """
-        | value     |
-        | --------- |
-        | Bucks60   |
-        | Raptors58 |
-        | 76ers51   |
-        | Celtics49 |
-        | Pacers48  |
-
-        """
-    )
-
-
 def test_string_concat(pyolin):
     assert pyolin('fields[0] + "++"') == string_block(
         """
@@ -361,91 +550,6 @@ def test_string_concat(pyolin):
     )
 
 
-def test_lt(pyolin):
-    assert pyolin("fields[0] if fields[2] < 51") == string_block(
-        """
-        | value   |
-        | ------- |
-        | Celtics |
-        | Pacers  |
-
-        """
-    )
-
-
-def test_le(pyolin):
-    assert pyolin("fields[0] if fields[2] <= 51") == string_block(
-        """
-        | value   |
-        | ------- |
-        | 76ers   |
-        | Celtics |
-        | Pacers  |
-
-        """
-    )
-
-
-def test_subtraction(pyolin):
-    assert pyolin("fields[2] - 50") == string_block(
-        """
-        | value |
-        | ----- |
-        | 10    |
-        | 8     |
-        | 1     |
-        | -1    |
-        | -2    |
-
-        """
-    )
-
-
-def test_rsub(pyolin):
-    assert pyolin("50 - fields[2]") == string_block(
-        """
-        | value |
-        | ----- |
-        | -10   |
-        | -8    |
-        | -1    |
-        | 1     |
-        | 2     |
-
-        """
-    )
-
-
-def test_left_shift(pyolin):
-    assert pyolin("fields[2] << 2") == string_block(
-        """
-        | value |
-        | ----- |
-        | 240   |
-        | 232   |
-        | 204   |
-        | 196   |
-        | 192   |
-
-        """
-    )
-
-
-def test_neg(pyolin):
-    assert pyolin("(-fields[2])") == string_block(
-        """
-        | value |
-        | ----- |
-        | -60   |
-        | -58   |
-        | -51   |
-        | -49   |
-        | -48   |
-
-        """
-    )
-
-
 def test_round(pyolin):
     assert pyolin("round(fields[2], -2)") == string_block(
         """
@@ -531,11 +635,7 @@ def test_contents(pyolin):
 
 
 def test_empty_list(pyolin):
-    assert pyolin("[]") == string_block(
-        """
-
-        """
-    )
+    assert pyolin("[]") == ""
 
 
 def test_markdown_empty_header(pyolin):
@@ -548,19 +648,17 @@ def test_markdown_empty_header(pyolin):
 
 
 def test_streaming_stdin(pyolin):
-    with pyolin.popen(
+    with pyolin.in_process(
         "cfg.parser.has_header = False; line",
         extra_args=["--input_format=awk", "--output_format=awk"],
     ) as proc:
         assert proc.stdin and proc.stdout
         proc.stdin.write("Raptors Toronto    58 24 0.707\n")
         proc.stdin.flush()
-        with timeout(2):
-            assert proc.stdout.readline() == "Raptors Toronto    58 24 0.707\n"
+        assert readline_with_timeout(proc.stdout) == "Raptors Toronto    58 24 0.707\n"
         proc.stdin.write("Celtics Boston     49 33 0.598\n")
         proc.stdin.flush()
-        with timeout(2):
-            assert proc.stdout.readline() == "Celtics Boston     49 33 0.598\n"
+        assert readline_with_timeout(proc.stdout) == "Celtics Boston     49 33 0.598\n"
 
 
 def test_closed_stdout(pyolin):
@@ -571,8 +669,7 @@ def test_closed_stdout(pyolin):
         assert proc.stdin and proc.stdout and proc.stderr
         proc.stdin.write("Raptors Toronto    58 24 0.707\n")
         proc.stdin.flush()
-        with timeout(2):
-            assert proc.stdout.readline() == "Raptors Toronto    58 24 0.707\n"
+        assert readline_with_timeout(proc.stdout) == "Raptors Toronto    58 24 0.707\n"
         # Command line tools like `head` will close the pipe when it is done
         # getting the data it needs. Make sure this doesn't crash
         proc.stdout.close()
@@ -581,10 +678,12 @@ def test_closed_stdout(pyolin):
         # proc.stdin.flush()
         errmsg = proc.stderr.read()
         assert errmsg == "", errmsg
+        # Exit with the same status as a process killed by SIGPIPE
+        assert proc.wait() == 141
 
 
 def test_streaming_stdin_binary(pyolin):
-    with pyolin.popen(
+    with pyolin.in_process(
         "file[:2]",
         extra_args=["--output_format=binary"],
         text=False,
@@ -594,7 +693,7 @@ def test_streaming_stdin_binary(pyolin):
 
 
 def test_streaming_slice(pyolin):
-    with pyolin.popen(
+    with pyolin.in_process(
         "cfg.parser.has_header = False; records[:2]",
         extra_args=["--input_format=awk", "--output_format=awk"],
     ) as proc:
@@ -602,14 +701,13 @@ def test_streaming_slice(pyolin):
         proc.stdin.write("Raptors Toronto    58 24 0.707\n")
         proc.stdin.write("Celtics Boston     49 33 0.598\n")
         proc.stdin.flush()
-        with timeout(2):
-            assert proc.stdout.readline() == "Raptors Toronto 58 24 0.707\n"
-            assert proc.stdout.readline() == "Celtics Boston 49 33 0.598\n"
+        assert readline_with_timeout(proc.stdout) == "Raptors Toronto 58 24 0.707\n"
+        assert readline_with_timeout(proc.stdout) == "Celtics Boston 49 33 0.598\n"
         proc.stdin.write("Write more stuff...\n")
 
 
 def test_streaming_index(pyolin):
-    with pyolin.popen(
+    with pyolin.in_process(
         "cfg.parser.has_header = False; records[1].str",
         extra_args=["--input_format=awk", "--output_format=awk"],
     ) as proc:
@@ -617,13 +715,12 @@ def test_streaming_index(pyolin):
         proc.stdin.write("Raptors Toronto    58 24 0.707\n")
         proc.stdin.write("Celtics Boston     49 33 0.598\n")
         proc.stdin.flush()
-        with timeout(2):
-            assert proc.stdout.readline() == "Celtics Boston     49 33 0.598\n"
+        assert readline_with_timeout(proc.stdout) == "Celtics Boston     49 33 0.598\n"
         proc.stdin.write("Write more stuff...\n")
 
 
 def test_streaming_index_with_auto_parser(pyolin):
-    with pyolin.popen(
+    with pyolin.in_process(
         "cfg.parser.has_header = False; records[1].str",
         extra_args=["--output_format=awk"],
     ) as proc:
@@ -635,11 +732,22 @@ def test_streaming_index_with_auto_parser(pyolin):
         proc.stdin.write("Bucks Milwaukee    49 33 0.598\n")
         proc.stdin.write("76ers Philly       49 33 0.598\n")
         proc.stdin.flush()
-        with timeout(2):
-            assert proc.stdout.readline() == "Celtics Boston     49 33 0.598\n"
+        assert readline_with_timeout(proc.stdout) == "Celtics Boston     49 33 0.598\n"
         proc.stdin.write("Write more stuff...\n")
 
 
+def test_startup_does_not_import_pandas(pyolin):
+    """pandas and numpy are only imported when `df`, `pd` or `np` is used, so
+    programs that don't need them don't pay for the import on startup."""
+    with pyolin.popen(
+        '"pandas" in sys.modules, "numpy" in sys.modules',
+        extra_args=["--output_format=awk"],
+    ) as proc:
+        stdout, stderr = proc.communicate("")
+        assert stderr == ""
+        assert stdout == "False False\n"
+
+
 def test_records_index(pyolin):
     assert pyolin("records[1]") == string_block(
         """
@@ -783,7 +891,9 @@ def test_awk_output_with_header(pyolin):
 
 
 def test_filename(pyolin):
-    assert pyolin("filename", input_=File("data_files.txt")) == string_block(
+    assert pyolin(
+        "filename", input_=File("data_files.txt", from_memory=False)
+    ) == string_block(
         f"""
         {os.path.dirname(__file__)}/data_files.txt
 
@@ -881,21 +991,6 @@ def test_fields_comparison(pyolin):
     )
 
 
-def test_multiplication(pyolin):
-    assert pyolin("fields[3] * 10") == string_block(
-        """
-        | value |
-        | ----- |
-        | 220   |
-        | 240   |
-        | 310   |
-        | 330   |
-        | 340   |
-
-        """
-    )
-
-
 def test_fields_multiplication(pyolin):
     assert pyolin("fields[3] * fields[2]") == string_block(
         """
@@ -911,36 +1006,12 @@ def test_fields_multiplication(pyolin):
     )
 
 
-def test_string_multiplication(pyolin):
-    assert pyolin("fields[0] * 2") == string_block(
-        """
-        | value          |
-        | -------------- |
-        | BucksBucks     |
-        | RaptorsRaptors |
-        | 76ers76ers     |
-        | CelticsCeltics |
-        | PacersPacers   |
-
-        """
-    )
-
-
+@requires_pandas
 def test_pandas_dataframe(pyolin):
-    assert pyolin("df") == string_block(
-        """
-        | 0       | 1            | 2  | 3  | 4     |
-        | ------- | ------------ | -- | -- | ----- |
-        | Bucks   | Milwaukee    | 60 | 22 | 0.732 |
-        | Raptors | Toronto      | 58 | 24 | 0.707 |
-        | 76ers   | Philadelphia | 51 | 31 | 0.622 |
-        | Celtics | Boston       | 49 | 33 | 0.598 |
-        | Pacers  | Indiana      | 48 | 34 | 0.585 |
-
-        """
-    )
+    assert pyolin("df") == _EXPECTED_NBA_TABLE
 
 
+@requires_pandas
 def test_pandas_dtypes(pyolin):
     assert pyolin("df.dtypes") == string_block(
         """
@@ -956,6 +1027,7 @@ def test_pandas_dtypes(pyolin):
     )
 
 
+@requires_pandas
 def test_panda_numeric_operations(pyolin):
     assert pyolin("df[2] * 2") == string_block(
         """
@@ -971,6 +1043,7 @@ def test_panda_numeric_operations(pyolin):
     )
 
 
+@requires_pandas
 def test_numpy_numeric_operations(pyolin):
     assert pyolin("np.power(df[2], 2)") == string_block(
         """
@@ -1107,6 +1180,7 @@ def test_record_separator_regex(pyolin):
     )
 
 
+@requires_pandas
 def test_simple_csv(pyolin):
     assert pyolin(
         "df[[0, 1, 2]]",
@@ -1186,6 +1260,7 @@ def test_quoted_csv_str(pyolin):
     )
 
 
+@requires_pandas
 def test_auto_csv(pyolin):
     assert pyolin(
         "df[[0,1,2]]",
@@ -1206,6 +1281,7 @@ def test_auto_csv(pyolin):
     )
 
 
+@requires_pandas
 def test_csv_excel(pyolin):
     assert pyolin(
         "df[[0,1,2]]",
@@ -1337,6 +1413,33 @@ def test_syntax_error_in_statement(pyolin):
     )
 
 
+def test_syntax_error_on_second_line(pyolin):
+    with pytest.raises(ErrorWithStderr) as exc:
+        pyolin("a = 1\nb..x\na+1")
+    assert str(exc.value.__cause__) == string_block(
+        """
+        Invalid syntax:
+          a = 1
+          b..x
+            ^
+        """
+    )
+
+
+def test_syntax_error_on_second_line_of_expression(pyolin):
+    with pytest.raises(ErrorWithStderr) as exc:
+        pyolin("a = 1\n(a +\n *2)")
+    assert str(exc.value.__cause__) == string_block(
+        """
+        Invalid syntax:
+          (a +
+           *2)
+           ^
+        """
+    )
+
+
+@requires_pandas
 def test_header_detection(pyolin):
     assert pyolin(
         'df[["Last name", "SSN", "Final"]]',
@@ -1378,6 +1481,7 @@ def test_force_has_header(pyolin):
     )
 
 
+@requires_pandas
 def test_header_detection_csv_excel(pyolin):
     assert pyolin(
         'df[["Last Name", "Address"]]',
@@ -1397,6 +1501,7 @@ def test_header_detection_csv_excel(pyolin):
     )
 
 
+@requires_pandas
 def test_print_dataframe_header(pyolin):
     assert pyolin(
         "list(df.columns.values)",
@@ -1420,18 +1525,6 @@ def test_print_dataframe_header(pyolin):
     )
 
 
-def test_assign_to_record(pyolin):
-    """
-    Try to confuse the parser by writing to a field called record
-    """
-    assert pyolin("record=1; record+1") == string_block(
-        """
-        2
-
-        """
-    )
-
-
 def test_access_record_and_table(pyolin):
     with pytest.raises(ErrorWithStderr) as exc:
         pyolin("a = record[0]; b = records; b")
@@ -1454,10 +1547,6 @@ def test_empty_table_scoped(pyolin):
     assert pyolin("record for record in records", input_=File(os.devnull)) == ""
 
 
-def test_semicolon_in_string(pyolin):
-    assert pyolin('"hello; world"') == "hello; world\n"
-
-
 def test_stack_trace_cleaning(pyolin):
     with pytest.raises(ErrorWithStderr) as exc:
         pyolin("urllib.parse.quote(12345)")
@@ -1566,6 +1655,7 @@ def test_csv_output_quoting(pyolin):
     )
 
 
+@requires_pandas
 def test_csv_output_with_header(pyolin):
     assert pyolin(
         'cfg.printer.print_header = True; df[["Last name", "SSN", "Final"]]',
@@ -1587,6 +1677,7 @@ def test_csv_output_with_header(pyolin):
     )
 
 
+@requires_pandas
 def test_csv_output_with_header_function(pyolin):
     def func():
         cfg.printer.print_header = True  # type: ignore  # noqa: F821
@@ -1612,20 +1703,29 @@ def test_csv_output_with_header_function(pyolin):
     )
 
 
+def test_in_process_communicate_large_input_and_output(pyolin):
+    # Larger than the pipe buffers in both directions
+    input_ = "".join(f"{i}\n" for i in range(50000))
+    with pyolin.in_process("line", extra_args=["--output_format", "txt"]) as proc:
+        stdout, stderr = proc.communicate(input_)
+    assert (stdout, stderr) == (input_, "")
+    assert proc.returncode == 0
+
+
 def test_streaming_stdin_csv(pyolin):
-    with pyolin.popen(
+    with pyolin.in_process(
         "cfg.parser.has_header = False; record",
         extra_args=["--output_format", "csv", "--input_format", "awk"],
     ) as proc:
         assert proc.stdin and proc.stdout
         proc.stdin.write("Raptors Toronto    58 24 0.707\n")
         proc.stdin.flush()
-        with timeout(2):
-            assert proc.stdout.readline() == "Raptors,Toronto,58,24,0.707\n"
+        expected = b"Raptors,Toronto,58,24,0.707\r\n"
+        assert read_with_timeout(proc.stdout, len(expected)) == expected
         proc.stdin.write("Celtics Boston     49 33 0.598\n")
         proc.stdin.flush()
-        with timeout(2):
-            assert proc.stdout.readline() == "Celtics,Boston,49,33,0.598\n"
+        expected = b"Celtics,Boston,49,33,0.598\r\n"
+        assert read_with_timeout(proc.stdout, len(expected)) == expected
 
 
 def test_numeric_header(pyolin):
@@ -1649,6 +1749,7 @@ def test_numeric_header(pyolin):
     )
 
 
+@requires_pandas
 def test_markdown_output(pyolin):
     assert pyolin(
         'df[["Last name", "SSN", "Final"]]',
@@ -1687,44 +1788,6 @@ def test_tsv_output(pyolin):
     )
 
 
-def test_multiline_input(pyolin):
-    assert (
-        pyolin(
-            string_block(
-                """
-                record = 1
-                record + 1
-                """
-            )
-        )
-        == string_block(
-            """
-            2
-
-            """
-        )
-    )
-
-
-def test_multiline_mixed_input(pyolin):
-    assert (
-        pyolin(
-            string_block(
-                """
-                record = 1; record += 1
-                record += 1; record + 1
-                """
-            ),
-        )
-        == string_block(
-            """
-            4
-
-            """
-        )
-    )
-
-
 def test_last_statement(pyolin):
     with pytest.raises(ErrorWithStderr) as exc:
         pyolin("1+1;pass")
@@ -1762,6 +1825,7 @@ def test_multiline_python_program(pyolin):
     )
 
 
+@requires_pandas
 def test_markdown_wrapping(pyolin):
     with mock.patch.dict(os.environ, {"PYOLIN_TABLE_WIDTH": "80"}):
         assert pyolin(
@@ -1905,26 +1969,14 @@ def test_json_output_with_header(pyolin):
     )
 
 
+@requires_pandas
 def test_json_input(pyolin):
     assert pyolin(
         "df",
         input_=File("data_colors.json"),
         input_format="json",
         output_format="markdown",
-    ) == string_block(
-        """
-        | color   | value |
-        | ------- | ----- |
-        | red     | #f00  |
-        | green   | #0f0  |
-        | blue    | #00f  |
-        | cyan    | #0ff  |
-        | magenta | #f0f  |
-        | yellow  | #ff0  |
-        | black   | #000  |
-
-        """
-    )
+    ) == _EXPECTED_COLORS_MD
 
 
 def test_jsonl_input(pyolin):
@@ -1991,20 +2043,7 @@ def test_contains(pyolin):
         ),
         (
             "records",
-            string_block(
-                """
-                | color   | value |
-                | ------- | ----- |
-                | red     | #f00  |
-                | green   | #0f0  |
-                | blue    | #00f  |
-                | cyan    | #0ff  |
-                | magenta | #f0f  |
-                | yellow  | #ff0  |
-                | black   | #000  |
-
-                """,
-            ),
+            _EXPECTED_COLORS_MD,
         ),
         (
             "record.source",
@@ -2037,33 +2076,39 @@ def test_markdown_output_format(pyolin, prog, expected):
     )
 
 
-def test_markdown_non_uniform_column_count(pyolin):
-    assert pyolin(
+# Programs that don't read any input, checked in one test to share the setup.
+_NO_INPUT_CASES = [
+    # Try to confuse the parser by writing to a variable called record
+    ("record=1; record+1", "auto", "2\n"),
+    ('"hello; world"', "auto", "hello; world\n"),
+    ("record = 1\nrecord + 1", "auto", "2\n"),
+    ("record = 1; record += 1\nrecord += 1; record + 1", "auto", "4\n"),
+    (
         "range(i) for i in range(1, 5)",
-        output_format="markdown",
-    ) == string_block(
-        """
-        | value |
-        | ----- |
-        | 0     |
-        | 0     | 1 |
-        | 0     | 1 | 2 |
-        | 0     | 1 | 2 | 3 |
+        "markdown",
+        string_block(
+            """
+            | value |
+            | ----- |
+            | 0     |
+            | 0     | 1 |
+            | 0     | 1 | 2 |
+            | 0     | 1 | 2 | 3 |
 
-        """
-    )
+            """
+        ),
+    ),
+    ("range(10)", "repr", "range(0, 10)\n"),
+    ('"aloha\u2011\u2011\u2011"', "repr", "'aloha\u2011\u2011\u2011'\n"),
+    ('"aloha\u2011\u2011\u2011"', "str", "aloha\u2011\u2011\u2011\n"),
+    ('cfg.printer = new_printer("repr"); range(10)', "auto", "range(0, 10)\n"),
+]
 
 
-def test_repr_printer(pyolin):
-    assert pyolin(
-        "range(10)",
-        output_format="repr",
-    ) == string_block(
-        """
-        range(0, 10)
-
-        """
-    )
+def test_programs_without_input(pyolin, subtests):
+    for prog, output_format, expected in _NO_INPUT_CASES:
+        with subtests.test(prog=prog, output_format=output_format):
+            assert pyolin(prog, input_=b"", output_format=output_format) == expected
 
 
 def test_repr_printer_table(pyolin):
@@ -2075,30 +2120,6 @@ def test_repr_printer_table(pyolin):
     )
 
 
-def test_repr_printer_records(pyolin):
-    assert pyolin(
-        '"aloha\u2011\u2011\u2011"',
-        output_format="repr",
-    ) == string_block(
-        """
-        'aloha\u2011\u2011\u2011'
-
-        """
-    )
-
-
-def test_str_printer_records(pyolin):
-    assert pyolin(
-        '"aloha\u2011\u2011\u2011"',
-        output_format="str",
-    ) == string_block(
-        """
-        aloha\u2011\u2011\u2011
-
-        """
-    )
-
-
 def test_str_printer_table(pyolin):
     assert pyolin(
         "records",
@@ -2111,15 +2132,6 @@ def test_str_printer_table(pyolin):
     )
 
 
-def test_set_printer(pyolin):
-    assert pyolin('cfg.printer = new_printer("repr"); range(10)') == string_block(
-        """
-        range(0, 10)
-
-        """
-    )
-
-
 def test_printer_none(pyolin):
     with pytest.raises(ErrorWithStderr) as exc:
         pyolin("cfg.printer = None; 123")
@@ -2307,24 +2319,12 @@ def test_set_record_separator(pyolin):
     )
 
 
+@requires_pandas
 def test_set_parser_json(pyolin):
     assert pyolin(
         'cfg.parser = new_parser("json"); df',
         input_=File("data_colors.json"),
-    ) == string_block(
-        """
-        | color   | value |
-        | ------- | ----- |
-        | red     | #f00  |
-        | green   | #0f0  |
-        | blue    | #00f  |
-        | cyan    | #0ff  |
-        | magenta | #f0f  |
-        | yellow  | #ff0  |
-        | black   | #000  |
-
-        """
-    )
+    ) == _EXPECTED_COLORS_MD
 
 
 def test_set_parser_record(pyolin):
@@ -2334,38 +2334,39 @@ def test_set_parser_record(pyolin):
 
 
 def test_records_if_undefined(pyolin):
-    assert pyolin("records if False") == string_block(
-        """
+    assert pyolin("records if False") == ""
 
-        """
-    )
 
+def test_gen_records_if_undefined(nba_bytes):
+    assert pyolin.run("records if False", input_=io.BytesIO(nba_bytes)) == _UNDEFINED_
 
-def test_gen_records_if_undefined():
-    assert pyolin.run("records if False", input_=File("data_nba.txt")) == _UNDEFINED_
 
+def test_undefined_is_singleton():
+    assert Undefined() is _UNDEFINED_
 
-@pytest.mark.parametrize(
-    "output_format, expected",
-    [
-        ("repr", "Undefined()\n"),
-        ("str", ""),
-        ("json", ""),
-        ("jsonl", ""),
-        ("awk", ""),
-        ("auto", ""),
-        ("binary", ""),
-        ("csv", ""),
-    ],
-)
-def test_undefined(pyolin, output_format, expected):
-    assert (
-        pyolin(
-            "_UNDEFINED_",
-            output_format=output_format,
-        )
-        == expected
-    )
+
+_UNDEFINED_CASES = [
+    ("repr", "Undefined()\n"),
+    ("str", ""),
+    ("json", ""),
+    ("csv", ""),
+    ("jsonl", ""),
+    ("awk", ""),
+    ("auto", ""),
+    ("binary", ""),
+]
+
+
+def test_undefined(pyolin, subtests):
+    for output_format, expected in _UNDEFINED_CASES:
+        with subtests.test(output_format=output_format):
+            assert (
+                pyolin(
+                    "_UNDEFINED_",
+                    output_format=output_format,
+                )
+                == expected
+            )
 
 
 def test_name_error(pyolin):
@@ -2428,25 +2429,14 @@ def test_record_num(pyolin):
 
 
 def test_trailing_newline(pyolin):
-    assert pyolin("records\n") == string_block(
-        """
-        | 0       | 1            | 2  | 3  | 4     |
-        | ------- | ------------ | -- | -- | ----- |
-        | Bucks   | Milwaukee    | 60 | 22 | 0.732 |
-        | Raptors | Toronto      | 58 | 24 | 0.707 |
-        | 76ers   | Philadelphia | 51 | 31 | 0.622 |
-        | Celtics | Boston       | 49 | 33 | 0.598 |
-        | Pacers  | Indiana      | 48 | 34 | 0.585 |
+    assert pyolin("records\n") == _EXPECTED_NBA_TABLE
 
-        """
-    )
 
-
-def test_execute_function():
+def test_execute_function(nba_bytes):
     def get_records():
         return records  # type: ignore  # noqa: F821
 
-    assert pyolin.run(get_records, input_=File("data_nba.txt").path()) == [
+    assert pyolin.run(get_records, input_=io.BytesIO(nba_bytes)) == [
         ("Bucks", "Milwaukee", 60, 22, 0.732),
         ("Raptors", "Toronto", 58, 24, 0.707),
         ("76ers", "Philadelphia", 51, 31, 0.622),
@@ -2455,11 +2445,11 @@ def test_execute_function():
     ]
 
 
-def test_execute_function_record_scoped():
+def test_execute_function_record_scoped(nba_bytes):
     def get_records():
         return record[0]  # type: ignore  # noqa: F821
 
-    assert pyolin.run(get_records, input_=File("data_nba.txt").path()) == [
+    assert pyolin.run(get_records, input_=io.BytesIO(nba_bytes)) == [
         "Bucks",
         "Raptors",
         "76ers",
@@ -2468,6 +2458,12 @@ def test_execute_function_record_scoped():
     ]
 
 
+def test_execute_precompiled_prog(nba_bytes):
+    prog = Prog("record[0]")
+    assert pyolin.run(prog, input_=io.BytesIO(nba_bytes))[:2] == ["Bucks", "Raptors"]
+    assert pyolin.run(prog, input_=io.BytesIO(b"a b\nc d\n")) == ["a", "c"]
+
+
 def test_double_semi_colon(pyolin):
     assert pyolin("record = 1; record += 1;; record += 1; record + 1") == string_block(
         """
@@ -2554,9 +2550,10 @@ def test_argv(pyolin):
 
 
 @pytest.mark.parametrize(
-    "output_format, expected",
+    "prog, output_format, expected",
     [
         (
+            "json.loads(file)[0]",
             "txt",
             string_block(
                 """
@@ -2567,6 +2564,7 @@ def test_argv(pyolin):
             ),
         ),
         (
+            "json.loads(file)[0]",
             "json",
             string_block(
                 """
@@ -2578,23 +2576,8 @@ def test_argv(pyolin):
                 """,
             ),
         ),
-    ],
-)
-def test_manual_load_json_record(pyolin, output_format, expected):
-    assert (
-        pyolin(
-            "json.loads(file)[0]",
-            input_=File("data_colors.json"),
-            output_format=output_format,
-        )
-        == expected
-    )
-
-
-@pytest.mark.parametrize(
-    "output_format, expected",
-    [
         (
+            "json.loads(file)",
             "txt",
             # There isn't really a correct format for arbitrary JSON when using txt output.
             # Currently each object has its key-value pair flattened into separate columns
@@ -2613,6 +2596,7 @@ def test_manual_load_json_record(pyolin, output_format, expected):
             ),
         ),
         (
+            "json.loads(file)",
             "json",
             string_block(
                 """
@@ -2651,28 +2635,17 @@ def test_manual_load_json_record(pyolin, output_format, expected):
             ),
         ),
         (
+            "json.loads(file)",
             "md",
-            string_block(
-                """
-                | color   | value |
-                | ------- | ----- |
-                | red     | #f00  |
-                | green   | #0f0  |
-                | blue    | #00f  |
-                | cyan    | #0ff  |
-                | magenta | #f0f  |
-                | yellow  | #ff0  |
-                | black   | #000  |
-
-                """,
-            ),
+            _EXPECTED_COLORS_MD,
         ),
     ],
+    ids=["first-txt", "first-json", "all-txt", "all-json", "all-md"],
 )
-def test_manual_load_json_output(pyolin, output_format, expected):
+def test_manual_load_json(pyolin, prog, output_format, expected):
     assert (
         pyolin(
-            "json.loads(file)",
+            prog,
             input_=File("data_colors.json"),
             output_format=output_format,
         )
@@ -2802,27 +2775,7 @@ def test_3d_table(pyolin):
     assert pyolin(
         "[['foo', ['a', 'b']], ['bar', ['c', 'd']]]",
         input_=File("data_json_example.json"),
-    ) == string_block(
-        """
-        [
-          [
-            "foo",
-            [
-              "a",
-              "b"
-            ]
-          ],
-          [
-            "bar",
-            [
-              "c",
-              "d"
-            ]
-          ]
-        ]
-
-        """
-    )
+    ) == _EXPECTED_NESTED_JSON
 
 
 def test_multiline_json_prog(pyolin):
@@ -2837,27 +2790,7 @@ def test_multiline_json_prog(pyolin):
             ),
             input_=File("data_json_example.json"),
         )
-        == string_block(
-            """
-            [
-              [
-                "foo",
-                [
-                  "a",
-                  "b"
-                ]
-              ],
-              [
-                "bar",
-                [
-                  "c",
-                  "d"
-                ]
-              ]
-            ]
-
-            """
-        )
+        == _EXPECTED_NESTED_JSON
     )
 
 
@@ -2923,6 +2856,92 @@ def test_records_negative_slice_step(pyolin):
     )
 
 
+def test_streaming_sequence_replays_consumed_items():
+    pulled = []
+    seq = StreamingSequence(pulled.append(i) or i for i in range(5))
+    assert next(iter(seq)) == 0
+    assert pulled == [0]  # Only the first item was pulled from the source
+    assert list(seq) == [0, 1, 2, 3, 4]
+    assert list(seq) == [0, 1, 2, 3, 4]
+    assert pulled == [0, 1, 2, 3, 4]
+
+
+def test_streaming_sequence_index():
+    pulled = []
+    seq = StreamingSequence(pulled.append(i) or i for i in range(5))
+    assert [seq[i] for i in range(3)] == [0, 1, 2]
+    assert pulled == [0, 1, 2]  # Indexing only pulls the items it needs
+    assert seq[4] == 4
+    with pytest.raises(IndexError):
+        seq[5]  # pylint: disable=pointless-statement
+
+
+def test_streaming_sequence_concat():
+    seq = StreamingSequence(iter([1, 2]))
+    seq_with_gen = seq + (i for i in (3, 4))
+    concatenated = [0] + seq_with_gen + [5]
+    assert list(concatenated) == [0, 1, 2, 3, 4, 5]
+    assert list(seq_with_gen) == [1, 2, 3, 4]
+    assert list(seq) == [1, 2]
+
+
+def test_item_dict():
+    calls = []
+    item_dict = ItemDict(
+        plain=1,
+        item=Item(lambda: calls.append("item") or len(calls)),
+        cached=CachedItem(lambda: calls.append("cached") or len(calls)),
+    )
+    assert item_dict["plain"] == 1
+    assert [item_dict["item"], item_dict["item"]] == [1, 2]
+    assert [item_dict["cached"], item_dict["cached"]] == [3, 3]
+    item_dict["plain"] = Item(lambda: "replaced")
+    assert item_dict["plain"] == "replaced"
+    assert calls == ["item", "item", "cached"]
+
+
+def test_item_dict_contains_items():
+    item = Item(lambda: 2)
+    item_dict = ItemDict(plain=1, item=item)
+    assert "item" in item_dict
+    assert item_dict.get("item") is item
+    assert item_dict.get("missing", 3) == 3
+    # Items that were not evaluated are not iterated over or copied
+    assert list(item_dict) == ["plain"]
+    assert len(item_dict) == 1
+    assert dict(item_dict) == {"plain": 1}
+
+
+def test_globals_contains_items(pyolin):
+    assert pyolin('"records" in globals()') == "True\n"
+    assert pyolin('"records" in list(globals())') == "False\n"
+    assert pyolin('type(globals().get("records")).__name__') == "CachedItem\n"
+
+
+@pytest.mark.parametrize(
+    "prog",
+    [
+        'dict(globals())["cfg"] is cfg',
+        '{**globals()}["cfg"] is cfg',
+        'globals().copy()["cfg"] is cfg',
+    ],
+)
+def test_copy_globals(pyolin, prog):
+    # Copying must not evaluate items, such as `jsonobj` which can't parse
+    # this input
+    assert pyolin(prog) == "True\n"
+
+
+def test_item_dict_missing_module():
+    item_dict = ItemDict()
+    assert item_dict["os"] is os
+    with mock.patch("importlib.import_module", side_effect=ModuleNotFoundError):
+        for _ in range(2):
+            with pytest.raises(KeyError):
+                item_dict["len"]  # pylint: disable=pointless-statement
+        assert importlib.import_module.call_count == 1
+
+
 # TODOs:
 # Bash / Zsh autocomplete integration
 # Multiline / interactive mode / ipython integration?
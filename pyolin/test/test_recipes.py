@@ -1,8 +1,36 @@
 """Recipes that are useful as examples in addition to testing."""
 
+import importlib.util
 
+import pytest
 from pyolin.test.conftest import string_block
 
+_INPUT_EVENT_BYTES = (
+    b"\x35\x49\xC9\x5C\x00\x00\x00\x00\x38\x27\x0B\x00"
+    b"\x00\x00\x00\x00\x04\x00\x04\x00\x5A\x00\x07\x00"
+    b"\x35\x49\xC9\x5C\x00\x00\x00\x00\x38\x27\x0B\x00"
+    b"\x00\x00\x00\x00\x01\x00\x50\x00\x01\x00\x00\x00"
+    b"\x35\x49\xC9\x5C\x00\x00\x00\x00\x38\x27\x0B\x00"
+    b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+)
+# struct input_event {
+#   struct timeval time {
+#     time_t tv_sec
+#     suseconds_t tv_usec
+#   }
+#   unsigned short type;
+#   unsigned short code;
+#   unsigned int value;
+# };
+_EXPECTED_INPUT_EVENTS = """
+    | tv_sec     | tv_usec | type | code | value  |
+    | ---------- | ------- | ---- | ---- | ------ |
+    | 1556695349 | 730936  | 4    | 4    | 458842 |
+    | 1556695349 | 730936  | 1    | 80   | 1      |
+    | 1556695349 | 730936  | 0    | 0    | 0      |
+
+    """
+
 
 def test_struct_pack(pyolin):
     """Parse a C-struct (or equivalent) representation using the struct module.
@@ -11,35 +39,52 @@ def test_struct_pack(pyolin):
 
     Example from https://stackoverflow.com/a/15597001/2921519"""
 
-    input_bytes = (
-        b"\x35\x49\xC9\x5C\x00\x00\x00\x00\x38\x27\x0B\x00"
-        b"\x00\x00\x00\x00\x04\x00\x04\x00\x5A\x00\x07\x00"
-        b"\x35\x49\xC9\x5C\x00\x00\x00\x00\x38\x27\x0B\x00"
-        b"\x00\x00\x00\x00\x01\x00\x50\x00\x01\x00\x00\x00"
-        b"\x35\x49\xC9\x5C\x00\x00\x00\x00\x38\x27\x0B\x00"
-        b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
-    )
-    # struct input_event {
-    #   struct timeval time {
-    #     time_t tv_sec
-    #     suseconds_t tv_usec
-    #   }
-    #   unsigned short type;
-    #   unsigned short code;
-    #   unsigned int value;
-    # };
-
     assert pyolin(
         "cfg.header = ('tv_sec', 'tv_usec', 'type', 'code', 'value');"
         "struct.iter_unpack('llHHI', file.bytes)",
-        input_=input_bytes,
+        input_=_INPUT_EVENT_BYTES,
+    ) == string_block(_EXPECTED_INPUT_EVENTS)
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("numpy") is None, reason="numpy is not installed"
+)
+def test_numpy_frombuffer(pyolin):
+    """Parse the same C-struct representation as `test_struct_pack` into a
+    numpy structured array, which is a view on the input buffer instead of a
+    tuple per record.
+
+    https://numpy.org/doc/stable/user/basics.rec.html"""
+
+    assert pyolin(
+        "np.frombuffer(file.bytes, dtype=[('tv_sec', 'i8'), ('tv_usec', 'i8'), "
+        "('type', 'u2'), ('code', 'u2'), ('value', 'u4')])",
+        input_=_INPUT_EVENT_BYTES,
+    ) == string_block(_EXPECTED_INPUT_EVENTS)
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("numba") is None, reason="numba is not installed"
+)
+def test_numba_jit(pyolin):
+    """JIT-compile a numeric kernel with numba and apply it to every record.
+
+    The kernel is compiled once on its first call, so it should be defined in a
+    file-scoped program (e.g. one that iterates over `records`) rather than a
+    record-scoped one, which would compile it again for every record.
+
+    https://numba.readthedocs.io/en/stable/user/jit.html"""
+    assert pyolin(
+        "kernel = numba.njit(lambda a, b: a * b + a ** 2);"
+        "[kernel(int(r[0]), int(r[1])) for r in records]",
+        input_=b"1 2\n3 4\n5 6\n",
     ) == string_block(
         """
-        | tv_sec     | tv_usec | type | code | value  |
-        | ---------- | ------- | ---- | ---- | ------ |
-        | 1556695349 | 730936  | 4    | 4    | 458842 |
-        | 1556695349 | 730936  | 1    | 80   | 1      |
-        | 1556695349 | 730936  | 0    | 0    | 0      |
+        | value |
+        | ----- |
+        | 3     |
+        | 21    |
+        | 55    |
 
         """
     )
@@ -53,3 +98,22 @@ def test_base64(pyolin):
 
         """
     )
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("pybase64") is None, reason="pybase64 is not installed"
+)
+def test_pybase64(pyolin):
+    """Base64 encode a given string from stdin using pybase64, a drop-in
+    replacement for the base64 module with a SIMD-accelerated encoder that is
+    considerably faster on large inputs.
+
+    https://github.com/mayeut/pybase64"""
+    assert pyolin(
+        "pybase64.b64encode(contents.bytes)", input_=b"Hello world"
+    ) == string_block(
+        """
+        SGVsbG8gd29ybGQ=
+
+        """
+    )
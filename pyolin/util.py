@@ -1,7 +1,6 @@
 """Utility functions."""
 
 import collections.abc
-import functools
 import itertools
 import os
 import sys
@@ -9,12 +8,14 @@ import importlib
 from typing import (
     Any,
     Callable,
+    Dict,
     Generic,
     Iterable,
     Iterator,
     List,
     Optional,
     Sequence,
+    Set,
     Tuple,
     TypeVar,
     Union,
@@ -23,23 +24,30 @@ from typing import (
 import typing
 
 
-def cache(func):
-    """Caches the return value for a given function."""
-    return functools.lru_cache(maxsize=None)(func)
+_DEBUG = bool(os.getenv("DEBUG"))
 
 
 def debug(*args: Any) -> None:
     """
     Print a debug statement. These are printed to the console if the $DEBUG env
-    var is set
+    var is set when pyolin is imported
     """
-    if os.getenv("DEBUG"):
+    if _DEBUG:
         print(*args, file=sys.stderr)
 
 
 class Undefined:
     """Marks an undefined value, typically filtered out when processing the
-    records."""
+    records. This is a singleton so that it can be checked by identity."""
+
+    __slots__ = ()
+    _instance: Optional["Undefined"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
     def __str__(self):
         return ""
 
@@ -70,27 +78,50 @@ class StreamingSequence(Sequence[T]):
     instead of eagerly looking through all of the items in the given iterator.
     """
 
+    __slots__ = ("_iter", "_list", "_exhausted", "_parts")
+
     def __init__(self, iterator):
-        self._iter = iterator
-        self._list = None
+        self._iter = iter(iterator)
+        # Items already pulled from `_iter`, in order. Every iterator over this
+        # sequence replays these before pulling more from `_iter`.
+        self._list: List[T] = []
+        self._exhausted = False
+        # The re-iterable parts this sequence is a concatenation of, if any
+        self._parts: Optional[Tuple[Iterable[T], ...]] = None
 
     @property
     def list(self) -> List[T]:
         """Materializes in this streaming sequence as a list and returns the
         result."""
-        if not self._list:
-            self._list = list(iter(self))
+        if not self._exhausted:
+            self._list.extend(self._iter)
+            self._exhausted = True
         return self._list
 
     def __iter__(self) -> Iterator:
-        if self._list:
+        if self._exhausted:
             return iter(self._list)
-        # Tee the iterator so every call to iter starts from the beginning
-        result, self._iter = itertools.tee(self._iter, 2)
-        return result
+        return self._iter_streaming()
+
+    def _iter_streaming(self) -> Iterator[T]:
+        i = 0
+        while True:
+            if i < len(self._list):
+                yield self._list[i]
+            elif self._exhausted:
+                return
+            else:
+                try:
+                    item = next(self._iter)
+                except StopIteration:
+                    self._exhausted = True
+                    return
+                self._list.append(item)
+                yield item
+            i += 1
 
     def __getitem__(self, key: Union[slice, int]) -> Union[Iterable[T], T]:
-        if self._list:
+        if self._exhausted:
             return self._list.__getitem__(key)
         if isinstance(key, slice):
             if (
@@ -104,11 +135,17 @@ class StreamingSequence(Sequence[T]):
         if key < 0:
             # Iterators can't do negative indexing. Materialize to a list
             return self.list[key]
-        try:
-            return next(itertools.islice(iter(self), key, key + 1))
-        except StopIteration:
-            # pylint:disable=raise-missing-from
-            raise IndexError("list index out of range")
+        self._fill(key + 1)
+        return self._list[key]
+
+    def _fill(self, size: int) -> None:
+        """Pulls items from the source until `size` items are buffered or the
+        source is exhausted."""
+        missing = size - len(self._list)
+        if missing > 0 and not self._exhausted:
+            self._list.extend(itertools.islice(self._iter, missing))
+            if len(self._list) < size:
+                self._exhausted = True
 
     def __reversed__(self) -> Iterable[T]:
         # Not necessary, but is probably (slightly) faster than the default
@@ -119,10 +156,31 @@ class StreamingSequence(Sequence[T]):
         return len(self.list)
 
     def __add__(self, other: Iterable[T]) -> Iterable[T]:
-        return StreamingSequence(itertools.chain(self, other))
+        return StreamingSequence._concat(self, other)
 
     def __radd__(self, other: Iterable[T]) -> Iterable[T]:
-        return StreamingSequence(itertools.chain(other, self))
+        return StreamingSequence._concat(other, self)
+
+    @staticmethod
+    def _concat(*seqs: Iterable[T]) -> "StreamingSequence[T]":
+        """Concatenates the given iterables. Concatenated StreamingSequences
+        are flattened into their parts, so that iterating over `a + b + c + d`
+        chains through one level instead of one per `+`."""
+        parts: List[Iterable[T]] = []
+        for seq in seqs:
+            if isinstance(seq, StreamingSequence):
+                parts.extend(seq._parts or (seq,))
+            elif isinstance(seq, collections.abc.Sequence):
+                parts.append(seq)
+            else:
+                # Buffer one-shot iterables, since the parts can be shared with
+                # other concatenations
+                parts.append(StreamingSequence(seq))
+        result: StreamingSequence[T] = StreamingSequence(
+            itertools.chain.from_iterable(parts)
+        )
+        result._parts = tuple(parts)
+        return result
 
     def __str__(self) -> str:
         return str(self.list)
@@ -134,28 +192,74 @@ class StreamingSequence(Sequence[T]):
 class ItemDict(dict):
     """
     A dict that can evaluate LazyItems on demand when they are accessed.
+
+    Items are kept in a side table rather than in the dict itself, so looking
+    up a plain value is a regular dict lookup, and items are only evaluated
+    from `__missing__`. Membership and `get` include the items, so
+    `"records" in globals()` still works in a pyolin program. Iteration,
+    `len` and copies (e.g. `dict(globals())`) only see the values stored in
+    the dict itself, so they never evaluate items.
     """
 
-    def __getitem__(self, key):
-        value = super().__getitem__(key)
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._items: Dict[str, Item] = {}
+        # Keys known not to be importable modules. Builtins like `len` are
+        # looked up here before falling back to the builtins module, so
+        # this avoids going through the import system on every access.
+        self._not_modules: Set[str] = set()
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, value):
         if isinstance(value, Item):
-            return value()
-        return value
+            super().pop(key, None)
+            self._items[key] = value
+        else:
+            self._items.pop(key, None)
+            super().__setitem__(key, value)
+
+    def update(self, *args, **kwargs):  # pylint:disable=arguments-differ
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __contains__(self, key):
+        return super().__contains__(key) or key in self._items
+
+    def get(self, key, default=None):
+        # Like a plain dict, `get` returns items without evaluating them
+        if super().__contains__(key):
+            return super().__getitem__(key)
+        return self._items.get(key, default)
 
     def __missing__(self, key):
+        item = self._items.get(key)
+        if item is not None:
+            value = item()
+            if isinstance(item, CachedItem):
+                # The value won't change anymore, so store it in the dict
+                # itself to skip the indirection on subsequent accesses.
+                del self._items[key]
+                super().__setitem__(key, value)
+            return value
+        if key in self._not_modules:
+            raise KeyError(key)
         try:
             return importlib.import_module(key)
         except ModuleNotFoundError:
+            self._not_modules.add(key)
             raise KeyError(key) from None
 
 
 T = TypeVar("T")
+_SENTINEL = object()
 
 
 class Item(Generic[T]):
     """An Item that is defined by a function, which will be initialized when this item is used,
     typically from ItemDict."""
 
+    __slots__ = ("func",)
+
     def __init__(self, func: Callable[[], T]):
         self.func = func
 
@@ -169,6 +273,8 @@ class CachedItem(Item[T]):
     called only on the first time the item is accessed.
     """
 
+    __slots__ = ("_val", "_on_accessed")
+
     def __init__(
         self,
         func: Callable[[], T],
@@ -176,16 +282,15 @@ class CachedItem(Item[T]):
         on_accessed: Optional[Callable[[], None]] = None,
     ):
         super().__init__(func)
-        self._val = None
-        self._cached = False
+        self._val: Union[T, object] = _SENTINEL
         self._on_accessed = on_accessed
 
     def __call__(self, *arg, **kwargs) -> T:
-        if not self._cached:
-            self._val = super().__call__(*arg, **kwargs)
+        if self._val is _SENTINEL:
+            val = super().__call__(*arg, **kwargs)
             if self._on_accessed:
                 self._on_accessed()
-            self._cached = True
+            self._val = val
         return typing.cast(T, self._val)
 
 
@@ -206,10 +311,12 @@ def peek_iter(iterator: Iterable[T], num: int) -> Tuple[Sequence[T], Iterable[T]
     functionally equivalent to the given one.
 
     The input `iterator` should not be used after passing into this function."""
-    if isinstance(iterator, collections.abc.Sequence):
+    if type(iterator) in (list, tuple, str, bytes) or isinstance(
+        iterator, collections.abc.Sequence
+    ):
         return iterator[:num], iterator
     iterator = iter(iterator)  # Ensure this is an iterator
-    preview = tuple(itertools.islice(iterator, 0, num))
+    preview = tuple(itertools.islice(iterator, num))
     return preview, itertools.chain(preview, iterator)
 
 
@@ -220,19 +327,34 @@ def tee_if_iterable(obj: Any) -> Tuple[Any, Any]:
     if isinstance(obj, collections.abc.Iterable):
         if not isinstance(obj, (collections.abc.Sequence, dict)):
             pandas = sys.modules.get("pandas", None)
-            if not (pandas and isinstance(obj, pandas.DataFrame)):
+            numpy = sys.modules.get("numpy", None)
+            if not (
+                (pandas and isinstance(obj, pandas.DataFrame))
+                or (numpy and isinstance(obj, numpy.ndarray))
+            ):
                 return itertools.tee(obj)
     return obj, obj
 
 
+_LIST_LIKE_TYPES = frozenset((list, tuple, set, frozenset))
+_SCALAR_TYPES = frozenset((str, bytes, dict, int, float, bool, type(None)))
+_NON_LIST_LIKE_TYPES = (str, bytes, dict)
+
+
 def is_list_like(obj: Any) -> bool:
     """Whether the given value is list like, including any iterables but
     excluding dicts, strs, and bytes."""
-    if not isinstance(obj, collections.abc.Iterable):
-        return False
-    if isinstance(obj, (str, bytes, dict)):
+    # Check the exact types of common values first, which is cheaper than
+    # going through isinstance
+    obj_type = type(obj)
+    if obj_type in _LIST_LIKE_TYPES:
+        return True
+    if obj_type in _SCALAR_TYPES or isinstance(obj, _NON_LIST_LIKE_TYPES):
         return False
-    return True
+    # Check for `__iter__` directly rather than going through the
+    # `collections.abc.Iterable` subclass hook. Like the hook, an `__iter__`
+    # set to None marks the type as not iterable.
+    return getattr(obj_type, "__iter__", None) is not None
 
 
 def clean_close_stdout_and_stderr() -> None:
@@ -240,20 +362,19 @@ def clean_close_stdout_and_stderr() -> None:
     in the middle of the cleanup.
 
     https://bugs.python.org/issue11380#msg248579"""
-    try:
-        sys.stdout.flush()
-    finally:
+    for cleanup in (
+        sys.stdout.flush,
+        sys.stdout.close,
+        sys.stderr.flush,
+        sys.stderr.close,
+    ):
         try:
-            sys.stdout.close()
-        finally:
-            try:
-                sys.stderr.flush()
-            finally:
-                sys.stderr.close()
+            cleanup()
+        except (OSError, ValueError):
+            pass  # The stream is broken or already closed
 
 
 T = TypeVar("T")
-_SENTINEL = object()
 
 
 class ReplayIter(Iterator[T]):